@@ -5,6 +5,8 @@ Main entry point for the HTTP Mock FastAPI server.
 
 import argparse
 import logging
+import os
+
 import uvicorn
 
 from app.server import app
@@ -39,23 +41,55 @@ def parse_args():
         action="store_true",
         help="Enable auto-reload for development",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", "1")),
+        help="Number of worker processes, ignored with --reload "
+        "(default: $WEB_CONCURRENCY or 1)",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=["debug", "info", "warning", "error"],
+        default=os.getenv("LOG_LEVEL", "info").lower(),
+        help="Log level of the server; debug logs every received message "
+        "and matched rule (default: $LOG_LEVEL or info)",
+    )
     return parser.parse_args()
 
 
 def main():
     """Run the FastAPI server"""
     args = parse_args()
+    # Exported so that reload and worker processes, which import
+    # app.server afresh, pick up the same level
+    os.environ["LOG_LEVEL"] = args.log_level
+    logging.getLogger("app").setLevel(args.log_level.upper())
     
     logger.info(
         f"Starting HTTP Mock Server on {args.host}:{args.port} "
-        f"(reload: {args.reload})"
+        f"(reload: {args.reload}, workers: {args.workers})"
     )
+    if args.workers > 1 and not args.reload:
+        logger.warning(
+            "Each worker keeps its own response configuration: POST /config "
+            "only updates the worker that receives it, so use a single worker "
+            "when changing the configuration at runtime"
+        )
     
+    # uvloop (picked by "auto" wherever it is installed) and httptools keep
+    # the event loop and HTTP parsing in C; access logs are disabled since
+    # they would add a log record per received message
     uvicorn.run(
         "app.server:app",
         host=args.host,
         port=args.port,
         reload=args.reload,
+        workers=None if args.reload else args.workers,
+        loop="auto",
+        http="httptools",
+        access_log=False,
+        log_level="warning",
     )
 
 
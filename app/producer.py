@@ -4,12 +4,14 @@ Kafka producer for sending test messages to a Confluent Kafka topic.
 Configured for SASL_SSL authentication.
 """
 
-import json
 import logging
 import os
+import threading
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterable, List, Literal, Optional, Tuple
 
+import msgspec
+import orjson
 from confluent_kafka import Producer
 from dotenv import load_dotenv
 
@@ -23,6 +25,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Kafka record headers as (key, encoded value) pairs; confluent-kafka needs
+# str keys and would stringify bytes keys
+Headers = List[Tuple[str, bytes]]
+
+# Supported message formats and the content-type header attached for each
+CONTENT_TYPE_HEADERS: Dict[str, Headers] = {
+    "json": [],
+    "msgpack": [("content-type", b"application/msgpack")],
+}
+
+# Producer settings for throughput runs: messages are disposable, so trade
+# delivery guarantees for fewer acknowledgement round trips and bigger batches
+PERF_PRODUCER_CONFIG: Dict[str, Any] = {
+    'acks': '1',
+    'linger.ms': 100,
+    'batch.size': 200000,
+    'compression.type': 'lz4',
+}
+
 
 class KafkaProducer:
     """
@@ -37,6 +58,10 @@ class KafkaProducer:
         sasl_password: str,
         topic: str,
         client_id: Optional[str] = None,
+        serializer: Optional[Callable[[Dict[str, Any]], bytes]] = None,
+        format: Literal["json", "msgpack"] = "json",
+        poll_interval: int = 1000,
+        config_overrides: Optional[Dict[str, Any]] = None,
     ):
         """
         Initialize the Kafka producer with SASL_SSL configuration.
@@ -47,8 +72,36 @@ class KafkaProducer:
             sasl_password: SASL password for authentication
             topic: Default topic to produce messages to
             client_id: Optional client ID for the producer
+            serializer: Optional callable turning a message dict into bytes
+                (defaults to the encoder for the chosen format)
+            format: Wire format of the message values, "json" or "msgpack";
+                msgpack messages carry a content-type header
+            poll_interval: Number of produced messages between polls for
+                delivery callbacks
+            config_overrides: Optional librdkafka settings applied on top of
+                the defaults, e.g. PERF_PRODUCER_CONFIG
         """
+        if format not in CONTENT_TYPE_HEADERS:
+            raise ValueError(f"Unsupported message format: {format}")
         self.topic = topic
+        self.format = format
+        # Headers identifying the message format, to be sent with every record
+        self.format_headers = CONTENT_TYPE_HEADERS[format]
+        if serializer is None:
+            if format == "msgpack":
+                serializer = msgspec.msgpack.Encoder().encode
+            else:
+                serializer = orjson.dumps
+        self.serializer = serializer
+        
+        # Delivery callbacks are served in bulk every poll_interval messages
+        self._poll_interval = poll_interval
+        self._produced_since_poll = 0
+        
+        # Delivery results are counted and summarized on flush()
+        self._ok = 0
+        self._err = 0
+        self._err_sample = None
         
         # Configure the producer with SASL_SSL
         config = {
@@ -58,16 +111,26 @@ class KafkaProducer:
             'sasl.mechanisms': 'PLAIN',
             'sasl.username': sasl_username,
             'sasl.password': sasl_password,
-            # Set sensible defaults for reliable delivery
-            'acks': 'all',
-            'retries': 5,
+            # Set sensible defaults for reliable delivery; use KAFKA_ACKS=1
+            # for throughput runs with disposable test messages
+            'acks': os.getenv("KAFKA_ACKS", "all"),
+            'retries': int(os.getenv("KAFKA_RETRIES", "5")),
             'retry.backoff.ms': 500,
             'socket.keepalive.enable': True,
+            # Batching and compression; raise KAFKA_LINGER_MS (e.g. to 100)
+            # for throughput runs so librdkafka can fill larger batches
+            'linger.ms': int(os.getenv("KAFKA_LINGER_MS", "50")),
+            'batch.size': int(os.getenv("KAFKA_BATCH_SIZE", "200000")),
+            'compression.type': os.getenv("KAFKA_COMPRESSION", "lz4"),
+            'queue.buffering.max.messages': 1000000,
         }
         
         # Add client ID if provided
         if client_id:
             config['client.id'] = client_id
+        
+        if config_overrides:
+            config.update(config_overrides)
             
         # Create the producer instance
         self.producer = Producer(config)
@@ -76,18 +139,25 @@ class KafkaProducer:
     def delivery_callback(self, err, msg):
         """
         Callback function called once for each produced message to
-        indicate success or failure.
+        indicate success or failure. Results are only counted here and
+        summarized by flush(); per-message details are logged at DEBUG.
         
         Args:
             err: Error (if any)
             msg: Message metadata
         """
         if err:
-            logger.error(f"Message delivery failed: {err}")
+            self._err += 1
+            self._err_sample = err
         else:
-            logger.info(
-                f"Message delivered to {msg.topic()} [{msg.partition()}] "
-                f"at offset {msg.offset()}"
+            self._ok += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Message delivery to %s [%s] at offset %s: %s",
+                msg.topic(),
+                msg.partition(),
+                msg.offset(),
+                err or "ok",
             )
 
     def produce(
@@ -101,7 +171,8 @@ class KafkaProducer:
         Produce a message to Kafka.
         
         Args:
-            message: Message payload as a dictionary (will be serialized to JSON)
+            message: Message payload as a dictionary (will be serialized with
+                the producer's serializer, JSON or msgpack by format)
             key: Optional message key
             headers: Optional message headers
             topic: Optional topic override (uses instance default if not specified)
@@ -109,30 +180,119 @@ class KafkaProducer:
         # Use the provided topic or fall back to the default
         target_topic = topic or self.topic
         
-        # Serialize the message to JSON
-        value = json.dumps(message).encode('utf-8')
+        # Serialize the message (JSON or msgpack bytes by format)
+        value = self.serializer(message)
         
         # Convert key to bytes if it's not None
         key_bytes = key.encode('utf-8') if key else None
         
         # Convert headers to the format expected by confluent-kafka
-        header_list = []
+        header_list = list(self.format_headers)
         if headers:
-            header_list = [(k, v.encode('utf-8')) for k, v in headers.items()]
+            header_list.extend((k, v.encode('utf-8')) for k, v in headers.items())
         
         # Produce the message
-        self.producer.produce(
-            topic=target_topic,
+        self.produce_raw(
             value=value,
             key=key_bytes,
             headers=header_list,
-            callback=self.delivery_callback,
+            topic=target_topic,
         )
         
-        # Poll to handle delivery callbacks
-        self.producer.poll(0)
+        logger.debug("Sent message to topic %s", target_topic)
+
+    def produce_raw(
+        self,
+        value: bytes,
+        key: Optional[bytes] = None,
+        headers: Optional[Headers] = None,
+        topic: Optional[str] = None,
+    ) -> None:
+        """
+        Produce an already serialized message to Kafka.
+        
+        Fast path for callers that encode values, keys and headers
+        themselves, e.g. to reuse header tuples across many messages.
+        The headers are sent as-is, so callers should include
+        format_headers themselves.
+        
+        Args:
+            value: Serialized message payload
+            key: Optional message key as bytes
+            headers: Optional list of (key, value) header tuples
+            topic: Optional topic override (uses instance default if not specified)
+        """
+        while True:
+            try:
+                self.producer.produce(
+                    topic=topic or self.topic,
+                    value=value,
+                    key=key,
+                    headers=headers,
+                    callback=self.delivery_callback,
+                )
+                break
+            except BufferError:
+                # Local queue is full: serve delivery callbacks to make room
+                self.producer.poll(0.1)
+        
+        # Poll in bulk to handle delivery callbacks
+        self._produced_since_poll += 1
+        if self._produced_since_poll >= self._poll_interval:
+            self.producer.poll(0)
+            self._produced_since_poll = 0
+
+    def produce_many(
+        self,
+        records: Iterable[Tuple[Optional[bytes], bytes, Headers]],
+        poll_every: int = 1000,
+        topic: Optional[str] = None,
+        stop_event: Optional[threading.Event] = None,
+    ) -> int:
+        """
+        Produce many already serialized messages to Kafka.
+        
+        Bulk variant of produce_raw() that polls for delivery callbacks
+        only once every poll_every messages.
         
-        logger.info(f"Sent message to topic {target_topic}: {message}")
+        Args:
+            records: Iterable of (key, value, headers) tuples, with the same
+                types as accepted by produce_raw()
+            poll_every: Number of produced messages between polls (at least 1)
+            topic: Optional topic override (uses instance default if not specified)
+            stop_event: Optional event that, once set, stops producing the
+                remaining records
+            
+        Returns:
+            Number of messages produced
+        """
+        if poll_every < 1:
+            raise ValueError(f"poll_every must be at least 1, got {poll_every}")
+        target_topic = topic or self.topic
+        produce = self.producer.produce
+        poll = self.producer.poll
+        callback = self.delivery_callback
+        count = 0
+        for key, value, headers in records:
+            if stop_event is not None and stop_event.is_set():
+                break
+            while True:
+                try:
+                    produce(
+                        target_topic, value, key, headers=headers, callback=callback
+                    )
+                    break
+                except BufferError:
+                    if stop_event is not None and stop_event.is_set():
+                        return count
+                    # Local queue is full: serve delivery callbacks to make room
+                    poll(0.1)
+            count += 1
+            if count % poll_every == 0:
+                poll(0)
+        
+        logger.debug("Sent %d messages to topic %s", count, target_topic)
+        return count
 
     def flush(self, timeout: int = 10) -> None:
         """
@@ -142,16 +302,31 @@ class KafkaProducer:
             timeout: Maximum time to wait in seconds
         """
         remaining = self.producer.flush(timeout)
+        self._produced_since_poll = 0
         if remaining > 0:
             logger.warning(f"{remaining} messages remain unflushed after timeout")
         else:
             logger.info("All messages flushed successfully")
+        
+        # Summarize delivery results since the last flush
+        logger.info(f"Delivered {self._ok} messages, {self._err} failed")
+        if self._err:
+            logger.error(f"Message delivery failed, last error: {self._err_sample}")
+        self._ok = 0
+        self._err = 0
+        self._err_sample = None
 
 
-def create_sample_producer_from_env() -> KafkaProducer:
+def create_sample_producer_from_env(
+    config_overrides: Optional[Dict[str, Any]] = None,
+) -> KafkaProducer:
     """
     Create a sample producer using environment variables.
     
+    Args:
+        config_overrides: Optional librdkafka settings applied on top of the
+            environment-based configuration
+    
     Required environment variables:
         KAFKA_BOOTSTRAP_SERVERS: Kafka bootstrap servers
         KAFKA_SASL_USERNAME: SASL username
@@ -160,12 +335,19 @@ def create_sample_producer_from_env() -> KafkaProducer:
     
     Optional environment variables:
         KAFKA_CLIENT_ID: Client ID for the producer
+        KAFKA_ACKS: Producer acks (default: all)
+        KAFKA_RETRIES: Producer retries (default: 5)
+        KAFKA_LINGER_MS: Producer linger.ms (default: 50)
+        KAFKA_BATCH_SIZE: Producer batch.size in bytes (default: 200000)
+        KAFKA_COMPRESSION: Producer compression.type (default: lz4)
+        KAFKA_MESSAGE_FORMAT: Message format, "json" or "msgpack" (default: json)
     """
     bootstrap_servers = os.getenv("KAFKA_BOOTSTRAP_SERVERS")
     sasl_username = os.getenv("KAFKA_SASL_USERNAME")
     sasl_password = os.getenv("KAFKA_SASL_PASSWORD")
     topic = os.getenv("KAFKA_TOPIC")
     client_id = os.getenv("KAFKA_CLIENT_ID")
+    message_format = os.getenv("KAFKA_MESSAGE_FORMAT", "json")
     
     # Check if required variables are set
     if not all([bootstrap_servers, sasl_username, sasl_password, topic]):
@@ -179,6 +361,8 @@ def create_sample_producer_from_env() -> KafkaProducer:
         sasl_password=sasl_password,
         topic=topic,
         client_id=client_id,
+        format=message_format,
+        config_overrides=config_overrides,
     )
 
 
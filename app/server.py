@@ -5,12 +5,15 @@ This server can be configured to return different HTTP response codes
 based on the content of received JSON messages.
 """
 
-import json
 import logging
-from typing import Any, Dict, List, Optional, Union
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from fastapi import FastAPI, Request, Response, status
+import orjson
+from fastapi import FastAPI, Response, status
 from pydantic import BaseModel, Field
+from starlette.routing import Route
+from starlette.types import Receive, Scope, Send
 
 # Configure logging
 logging.basicConfig(
@@ -18,6 +21,9 @@ logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
 )
 logger = logging.getLogger(__name__)
+# Per-message logs are emitted at DEBUG; set LOG_LEVEL=debug (or pass
+# --log-level debug to app.main) to see received payloads and matched rules
+logging.getLogger("app").setLevel(os.getenv("LOG_LEVEL", "info").upper())
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -77,25 +83,112 @@ class ResponseConfig(BaseModel):
     response_body: Dict[str, Any]
 
 
+class DefaultResponseConfig(BaseModel):
+    """Response returned when no configured rule matches"""
+    response_code: int = 200
+    response_body: Dict[str, Any] = {"message": "Message received successfully"}
+
+
 class MockServerConfig(BaseModel):
     """Complete configuration for the mock server"""
-    default: Dict[str, Any] = Field(
-        default={
-            "response_code": 200,
-            "response_body": {"message": "Message received successfully"},
-        }
-    )
+    default: DefaultResponseConfig = Field(default_factory=DefaultResponseConfig)
     configurations: List[ResponseConfig] = []
 
 
-# Current server configuration
-server_config = MockServerConfig(
-    default=RESPONSE_CONFIGS["default"],
-    configurations=[
-        ResponseConfig(**config) for config in RESPONSE_CONFIGS["configurations"]
-    ],
+# Pre-built ASGI "http.response.start" and "http.response.body" messages
+ResponseMessages = Tuple[Dict[str, Any], Dict[str, Any]]
+
+
+def build_response(status_code: int, body: bytes) -> ResponseMessages:
+    """
+    Build the pair of ASGI messages for a JSON response, so that fixed
+    responses can be sent without constructing a Response object.
+    """
+    return (
+        {
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ],
+        },
+        {"type": "http.response.body", "body": body},
+    )
+
+
+# Maximum accepted size of an incoming message body in bytes
+MAX_BODY = 1 << 20
+
+# Static error responses, built once at import time
+BODY_TOO_LARGE_RESPONSE = build_response(
+    413, orjson.dumps({"error": "Request body too large"})
+)
+INVALID_JSON_RESPONSE = build_response(
+    400, orjson.dumps({"error": "Invalid JSON format"})
 )
 
+# Current server configuration as plain data. The Pydantic models above are
+# only used to validate POST /config; the request path never touches them.
+server_config: Dict[str, Any] = {}
+# JSON encoding of server_config, served as-is by GET /config
+server_config_bytes: bytes = b""
+# A compiled rule: (rule index, match_field, match_value, pre-built response).
+# The rule index preserves the "first configured rule wins" semantics when
+# several rules match.
+CompiledRule = Tuple[int, str, Any, ResponseMessages]
+# Compiled rule lookup table: match_field -> match_value -> compiled rule
+COMPILED_RULES: Dict[str, Dict[Any, CompiledRule]] = {}
+# Rules whose match_value is unhashable (lists, objects) and therefore
+# cannot be stored in COMPILED_RULES; these are still checked linearly.
+UNHASHABLE_RULES: List[CompiledRule] = []
+# Pre-built default response
+DEFAULT_RESPONSE: ResponseMessages = build_response(200, b"")
+
+
+def apply_configuration(config: MockServerConfig) -> None:
+    """
+    Store a validated configuration as plain data and rebuild the rule
+    lookup tables, pre-building every configured response once.
+
+    Raises orjson.JSONEncodeError (without changing the current
+    configuration) if the configuration cannot be serialized.
+    """
+    global server_config, server_config_bytes
+    global COMPILED_RULES, UNHASHABLE_RULES, DEFAULT_RESPONSE
+
+    plain_config = config.model_dump()
+    compiled: Dict[str, Dict[Any, CompiledRule]] = {}
+    unhashable: List[CompiledRule] = []
+    for index, rule in enumerate(plain_config["configurations"]):
+        field = rule["match_field"]
+        value = rule["match_value"]
+        response = build_response(
+            rule["response_code"], orjson.dumps(rule["response_body"])
+        )
+        compiled_rule = (index, field, value, response)
+        try:
+            compiled.setdefault(field, {}).setdefault(value, compiled_rule)
+        except TypeError:
+            unhashable.append(compiled_rule)
+
+    default = plain_config["default"]
+    default_response = build_response(
+        default["response_code"], orjson.dumps(default["response_body"])
+    )
+    config_bytes = orjson.dumps(plain_config)
+
+    # Everything that can fail is built above, so a rejected configuration
+    # leaves the current one fully in place
+    server_config = plain_config
+    server_config_bytes = config_bytes
+    COMPILED_RULES = compiled
+    UNHASHABLE_RULES = unhashable
+    DEFAULT_RESPONSE = default_response
+
+
+apply_configuration(MockServerConfig.model_validate(RESPONSE_CONFIGS))
+
 
 @app.get("/", status_code=200)
 async def root():
@@ -106,8 +199,15 @@ async def root():
 @app.post("/config", status_code=200)
 async def update_configuration(config: MockServerConfig):
     """Update the server's response configuration"""
-    global server_config
-    server_config = config
+    try:
+        apply_configuration(config)
+    except orjson.JSONEncodeError as e:
+        logger.warning(f"Rejected server configuration: {e}")
+        return Response(
+            content=orjson.dumps({"error": f"Invalid configuration: {e}"}),
+            status_code=422,
+            media_type="application/json",
+        )
     logger.info(f"Updated server configuration: {server_config}")
     return {"status": "ok", "message": "Configuration updated successfully"}
 
@@ -115,65 +215,110 @@ async def update_configuration(config: MockServerConfig):
 @app.get("/config", status_code=200)
 async def get_configuration():
     """Get the current server configuration"""
-    return server_config
+    return Response(content=server_config_bytes, media_type="application/json")
 
 
-@app.post("/{path:path}", status_code=200)
-async def handle_message(request: Request, path: str):
+async def handle_message(path: str, receive: Receive) -> Optional[ResponseMessages]:
     """
-    Main endpoint that processes incoming messages and returns
-    configured responses based on message content
+    Process an incoming message and pick the configured response based on
+    its content. Returns None if the client disconnected mid-request.
     """
     try:
-        # Get the raw request body
-        body = await request.body()
+        # Read the raw request body, rejecting oversized payloads early
+        chunks = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunk = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > MAX_BODY:
+                logger.warning(
+                    f"Rejected message at /{path}: body exceeds {MAX_BODY} bytes"
+                )
+                return BODY_TOO_LARGE_RESPONSE
+            chunks.append(chunk)
+        # Small payloads usually arrive in a single chunk, so avoid the join
+        body = chunks[0] if len(chunks) == 1 else b"".join(chunks)
         
         # Try to parse as JSON
         try:
-            data = json.loads(body)
-            logger.info(f"Received message at /{path}: {data}")
-        except json.JSONDecodeError:
+            data = orjson.loads(body)
+            logger.debug("Received message at /%s: %s", path, data)
+        except orjson.JSONDecodeError:
             logger.warning(f"Received non-JSON message at /{path}")
             # Return 400 for non-JSON messages
-            return Response(
-                content=json.dumps({"error": "Invalid JSON format"}),
-                status_code=400,
-                media_type="application/json",
-            )
+            return INVALID_JSON_RESPONSE
 
-        # Check if the message matches any of our configured response rules
-        for config in server_config.configurations:
-            if (
-                config.match_field in data
-                and data[config.match_field] == config.match_value
-            ):
-                logger.info(
-                    f"Matched rule: {config.match_field}={config.match_value}, "
-                    f"returning status code {config.response_code}"
-                )
-                return Response(
-                    content=json.dumps(config.response_body),
-                    status_code=config.response_code,
-                    media_type="application/json",
-                )
+        # Arrays, scalars and empty objects can never match a rule
+        if not isinstance(data, dict) or not data:
+            logger.debug("No matching rule found, using default response")
+            return DEFAULT_RESPONSE
+
+        # Check if the message matches any of our configured response rules,
+        # keeping the earliest configured rule if several of them match
+        hit = None
+        for field, rules in COMPILED_RULES.items():
+            if field in data:
+                try:
+                    match = rules.get(data[field])
+                except TypeError:
+                    # Unhashable values can only match UNHASHABLE_RULES
+                    continue
+                if match is not None and (hit is None or match[0] < hit[0]):
+                    hit = match
+        for rule in UNHASHABLE_RULES:
+            if hit is not None and hit[0] < rule[0]:
+                break
+            if rule[1] in data and data[rule[1]] == rule[2]:
+                hit = rule
+                break
+
+        if hit is not None:
+            _, field, value, response = hit
+            logger.debug(
+                "Matched rule: %s=%s, returning status code %s",
+                field,
+                value,
+                response[0]["status"],
+            )
+            return response
 
         # If no match, use the default response
-        logger.info(f"No matching rule found, using default response")
-        return Response(
-            content=json.dumps(server_config.default["response_body"]),
-            status_code=server_config.default["response_code"],
-            media_type="application/json",
-        )
+        logger.debug("No matching rule found, using default response")
+        return DEFAULT_RESPONSE
 
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
-        return Response(
-            content=json.dumps({"error": f"Server error: {str(e)}"}),
-            status_code=500,
-            media_type="application/json",
+        return build_response(
+            500, orjson.dumps({"error": f"Server error: {str(e)}"})
         )
 
 
+class MessageApp:
+    """
+    Raw ASGI app for incoming messages. It bypasses FastAPI and Starlette
+    request/response handling and sends the pre-built response messages
+    picked by handle_message() directly.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = await handle_message(scope["path_params"]["path"], receive)
+        if response is not None:
+            await send(response[0])
+            await send(response[1])
+
+
+# Catch-all route for incoming messages, registered after the FastAPI routes
+# above so that "/" and "/config" still take precedence
+app.router.routes.append(Route("/{path:path}", MessageApp(), methods=["POST"]))
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("server:app", host="0.0.0.0", port=8000, reload=True)
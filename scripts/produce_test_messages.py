@@ -4,16 +4,22 @@ Script to produce test messages to Kafka for HTTP Sink connector testing.
 """
 
 import argparse
-import json
 import logging
 import sys
+import threading
 import time
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
 
 # Add parent directory to path to allow importing the app modules
 sys.path.insert(0, "..")
 
-from app.producer import create_sample_producer_from_env
+from app.producer import (
+    PERF_PRODUCER_CONFIG,
+    Headers,
+    create_sample_producer_from_env,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -23,8 +29,16 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def parse_args():
-    """Parse command line arguments."""
+def positive_int(value: str) -> int:
+    """Argument type for integers greater than zero."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    """Parse command line arguments (from sys.argv unless argv is given)."""
     parser = argparse.ArgumentParser(
         description="Produce test messages to Kafka for HTTP Sink testing"
     )
@@ -37,15 +51,34 @@ def parse_args():
     parser.add_argument(
         "--delay",
         type=float,
-        default=0.5,
-        help="Delay between messages in seconds (default: 0.5)",
+        default=0.0,
+        help="Delay between messages in seconds (default: 0.0)",
+    )
+    parser.add_argument(
+        "--batch-mode",
+        action="store_true",
+        help="Ignore --delay and produce all messages in bulk, polling only "
+        "every --poll-every messages",
+    )
+    parser.add_argument(
+        "--poll-every",
+        type=positive_int,
+        default=1000,
+        help="Poll for delivery reports every N messages when producing in "
+        "bulk (default: 1000)",
+    )
+    parser.add_argument(
+        "--perf",
+        action="store_true",
+        help="Use throughput producer settings (acks=1, linger.ms=100, "
+        "batch.size=200000, compression.type=lz4)",
     )
     parser.add_argument(
         "--message-file",
         type=str,
         help="JSON file containing message templates to use",
     )
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
 def get_default_messages() -> List[Dict]:
@@ -74,8 +107,8 @@ def load_messages_from_file(file_path: str) -> List[Dict]:
         List of message templates
     """
     try:
-        with open(file_path, "r") as f:
-            messages = json.load(f)
+        with open(file_path, "rb") as f:
+            messages = orjson.loads(f.read())
             
         if not isinstance(messages, list):
             logger.error("Message file must contain a JSON array of message objects")
@@ -87,59 +120,144 @@ def load_messages_from_file(file_path: str) -> List[Dict]:
         return get_default_messages()
 
 
-def main():
-    """Main entry point for the script."""
-    args = parse_args()
+def build_records(
+    message_templates: List[Dict],
+    count: int,
+    static_headers: Headers,
+    serializer: Callable[[Dict], bytes],
+) -> Iterator[Tuple[bytes, bytes, Headers]]:
+    """
+    Build serialized (key, value, headers) records for the test messages,
+    cycling through the available message templates. Records are built
+    lazily, so their timestamps are taken close to when they are sent.
     
-    try:
-        # Create the producer using environment variables
-        producer = create_sample_producer_from_env()
+    Args:
+        message_templates: Message templates to cycle through
+        count: Number of records to build
+        static_headers: Headers shared by every message, already encoded
+        serializer: Callable turning a message dict into bytes
         
-        # Get message templates
-        if args.message_file:
-            message_templates = load_messages_from_file(args.message_file)
-            logger.info(f"Loaded {len(message_templates)} message templates from file")
-        else:
-            message_templates = get_default_messages()
-            logger.info(f"Using {len(message_templates)} default message templates")
+    Yields:
+        Records as accepted by KafkaProducer.produce_many()
+    """
+    ts = 0
+    headers: Headers = []
+    for i in range(count):
+        # Select a message template (cycling through the available templates)
+        template_idx = i % len(message_templates)
+        message = message_templates[template_idx].copy()
         
-        # Produce messages
-        logger.info(f"Producing {args.count} messages with {args.delay}s delay")
+        # Sample the timestamp and build the headers once per pass over the
+        # templates (its records share the list); second granularity is all
+        # that is needed
+        if template_idx == 0:
+            ts = int(time.time())
+            headers = static_headers + [
+                ("timestamp", str(ts).encode("utf-8")),
+                ("batch", str(i // len(message_templates) + 1).encode("utf-8")),
+            ]
         
-        for i in range(args.count):
-            # Select a message template (cycling through the available templates)
-            template_idx = i % len(message_templates)
-            message = message_templates[template_idx].copy()
-            
-            # Add a unique ID if not present
-            if "id" not in message:
-                message["id"] = i + 1
-            
-            # Add a timestamp
-            message["timestamp"] = int(time.time())
-            
-            # Use the message ID as the key
-            key = str(message["id"])
-            
-            # Add some headers
-            headers = {
-                "timestamp": str(int(time.time())),
-                "source": "test-producer",
-                "batch": str(i // len(message_templates) + 1),
-            }
-            
-            # Produce the message
-            producer.produce(message=message, key=key, headers=headers)
-            logger.info(f"Sent message {i+1}/{args.count}: {message}")
-            
-            # Small delay between messages
-            if i < args.count - 1:
-                time.sleep(args.delay)
+        # Add a unique ID if not present
+        if "id" not in message:
+            message["id"] = i + 1
         
-        # Make sure all messages are delivered
-        producer.flush()
-        logger.info("All messages sent successfully")
+        # Add a timestamp
+        message["timestamp"] = ts
         
+        # Use the message ID as the key
+        key = str(message["id"]).encode("utf-8")
+        
+        yield key, serializer(message), headers
+
+
+def log_progress(
+    records: Iterable[Tuple[bytes, bytes, Headers]],
+    count: int,
+    every: int = 1000,
+) -> Iterator[Tuple[bytes, bytes, Headers]]:
+    """
+    Pass records through, logging progress every `every` records once
+    the consumer has taken them.
+    """
+    for i, record in enumerate(records, 1):
+        yield record
+        if i % every == 0:
+            logger.info(f"Sent {i}/{count} messages")
+
+
+def produce_messages(
+    args: argparse.Namespace,
+    stop_event: Optional[threading.Event] = None,
+) -> None:
+    """
+    Produce test messages to Kafka as described by the parsed arguments.
+    
+    Args:
+        args: Arguments as returned by parse_args()
+        stop_event: Optional event that, once set, stops producing and skips
+            waiting for outstanding deliveries
+    """
+    if stop_event is None:
+        stop_event = threading.Event()
+    
+    # Create the producer using environment variables
+    producer = create_sample_producer_from_env(
+        config_overrides=PERF_PRODUCER_CONFIG if args.perf else None
+    )
+    
+    # Get message templates
+    if args.message_file:
+        message_templates = load_messages_from_file(args.message_file)
+        logger.info(f"Loaded {len(message_templates)} message templates from file")
+    else:
+        message_templates = get_default_messages()
+        logger.info(f"Using {len(message_templates)} default message templates")
+    
+    # Headers shared by every message, encoded once
+    static_headers = producer.format_headers + [("source", b"test-producer")]
+    
+    # Records are built lazily while they are produced
+    records = log_progress(
+        build_records(
+            message_templates, args.count, static_headers, producer.serializer
+        ),
+        args.count,
+    )
+    
+    # Produce messages
+    delay = 0.0 if args.batch_mode else args.delay
+    logger.info(f"Producing {args.count} messages with {delay}s delay")
+    
+    if delay > 0:
+        for i, (key, value, headers) in enumerate(records):
+            producer.produce_raw(value=value, key=key, headers=headers)
+            logger.debug("Sent message %d/%d", i + 1, args.count)
+            
+            # Small delay between messages, cut short when stopped
+            if i < args.count - 1 and stop_event.wait(delay):
+                break
+    else:
+        producer.produce_many(
+            records, poll_every=args.poll_every, stop_event=stop_event
+        )
+    
+    if stop_event.is_set():
+        # Don't wait for outstanding deliveries when asked to stop
+        producer.flush(0)
+        logger.info("Producer stopped")
+        return
+    
+    # Make sure all messages are delivered
+    producer.flush()
+    logger.info(f"All {args.count} messages sent successfully")
+
+
+def main():
+    """Main entry point for the script."""
+    args = parse_args()
+    
+    try:
+        produce_messages(args)
     except KeyboardInterrupt:
         logger.info("Producer interrupted by user")
     except Exception as e:
@@ -1,17 +1,28 @@
 #!/usr/bin/env python3
 """
 Demo script to run both the HTTP server and test the producer.
-This will start a FastAPI server in the background and then run
-the producer to send test messages to Kafka.
+This will start the FastAPI server and the producer in the same
+process and event loop, and then send test messages to Kafka.
+
+Run from the project root with "python -m scripts.run_demo" or directly
+with "python scripts/run_demo.py".
 """
 
 import argparse
+import asyncio
 import logging
 import os
-import signal
-import subprocess
 import sys
-import time
+import threading
+
+import uvicorn
+
+# Make the app and scripts packages importable when run as a plain script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.server import app
+from scripts.produce_test_messages import parse_args as parse_producer_args
+from scripts.produce_test_messages import produce_messages
 
 # Configure logging
 logging.basicConfig(
@@ -50,96 +61,85 @@ def parse_args():
         default=1.0,
         help="Delay between messages in seconds (default: 1.0)",
     )
+    parser.add_argument(
+        "--throughput",
+        action="store_true",
+        help="Measure throughput: produce without delay in batch mode",
+    )
     return parser.parse_args()
 
 
-def main():
-    """Main entry point for the demo script."""
-    args = parse_args()
-    
-    # Get the absolute path to the project root directory
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(script_dir)
+async def run_demo(args: argparse.Namespace) -> None:
+    """
+    Serve the mock server and run the producer in the same event loop.
+    The producer is blocking, so it runs in the default executor.
+    """
+    server = uvicorn.Server(
+        uvicorn.Config(app, host=args.host, port=args.port, access_log=False)
+    )
     
+    logger.info("Starting HTTP Mock Server...")
+    server_task = asyncio.ensure_future(server.serve())
+    # Tells the producer thread to stop; the executor thread cannot be
+    # cancelled, and asyncio.run() waits for it before exiting
+    stop_producer = threading.Event()
     try:
-        logger.info("Starting HTTP Mock Server...")
-        
-        # Start the server in a separate process
-        server_cmd = [
-            sys.executable,
-            "-m",
-            "app.main",
-            "--host",
-            args.host,
-            "--port",
-            str(args.port),
-            "--reload",
-        ]
-        server_process = subprocess.Popen(
-            server_cmd,
-            cwd=project_root,
-            # Redirect stdout and stderr to the current process
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,  # Line buffered
-        )
-        
-        # Start a thread to read and log output from the server process
-        import threading
-        
-        def log_server_output():
-            for line in server_process.stdout:
-                print(f"[SERVER] {line.strip()}")
-        
-        output_thread = threading.Thread(target=log_server_output, daemon=True)
-        output_thread.start()
-        
         # Wait for the server to start
-        logger.info("Waiting for server to start...")
-        time.sleep(3)
-        
-        # Check if the server is running
-        if server_process.poll() is not None:
-            logger.error("Server failed to start")
-            return
+        while not server.started:
+            if server_task.done():
+                logger.error("Server failed to start")
+                return
+            await asyncio.sleep(0.05)
         
         logger.info(f"Server started on {args.host}:{args.port}")
         
         # Run the producer
         logger.info(f"Producing {args.message_count} test messages...")
-        producer_cmd = [
-            sys.executable,
-            os.path.join(script_dir, "produce_test_messages.py"),
-            "--count",
-            str(args.message_count),
-            "--delay",
-            str(args.delay),
-        ]
-        producer_process = subprocess.run(
-            producer_cmd,
-            cwd=project_root,
-            check=True,
+        producer_argv = ["--count", str(args.message_count)]
+        if args.throughput:
+            producer_argv += ["--delay", "0", "--batch-mode"]
+        else:
+            producer_argv += ["--delay", str(args.delay)]
+        loop = asyncio.get_running_loop()
+        producer_future = loop.run_in_executor(
+            None, produce_messages, parse_producer_args(producer_argv), stop_producer
         )
         
+        # Stop the producer if the server shuts down (e.g. on Ctrl+C) first
+        await asyncio.wait(
+            {producer_future, server_task}, return_when=asyncio.FIRST_COMPLETED
+        )
+        if not producer_future.done():
+            stop_producer.set()
+        await producer_future
+        if stop_producer.is_set():
+            return
+        
         logger.info("Producer completed successfully")
         
         # Keep the server running until the user presses Ctrl+C
         logger.info("Press Ctrl+C to stop the server and exit")
-        while True:
-            time.sleep(1)
-            
+        await server_task
+    finally:
+        # Clean up
+        stop_producer.set()
+        if not server_task.done():
+            logger.info("Stopping server...")
+            server.should_exit = True
+            await server_task
+        logger.info("Server stopped")
+
+
+def main():
+    """Main entry point for the demo script."""
+    args = parse_args()
+    
+    try:
+        asyncio.run(run_demo(args))
     except KeyboardInterrupt:
         logger.info("Demo interrupted by user")
     except Exception as e:
         logger.error(f"Error running demo: {e}")
-    finally:
-        # Clean up
-        if "server_process" in locals():
-            logger.info("Stopping server...")
-            server_process.send_signal(signal.SIGINT)
-            server_process.wait(timeout=5)
-            logger.info("Server stopped")
 
 
 if __name__ == "__main__":
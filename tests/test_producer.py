@@ -0,0 +1,267 @@
+"""
+Tests for the Kafka producer and the test message script.
+"""
+
+import logging
+import threading
+
+import msgspec
+import orjson
+import pytest
+
+from app import producer as producer_module
+from app.producer import KafkaProducer
+from scripts import produce_test_messages
+from scripts.produce_test_messages import (
+    build_records,
+    get_default_messages,
+    load_messages_from_file,
+)
+
+
+class FakeProducer:
+    """Stand-in for confluent_kafka.Producer that records calls"""
+
+    def __init__(self, config):
+        self.config = config
+        self.produced = []
+        self.polls = []
+        self.buffer_errors = 0
+
+    def produce(self, topic, value=None, key=None, headers=None, callback=None):
+        # confluent-kafka stringifies non-str header keys
+        assert all(isinstance(k, str) for k, _ in headers or [])
+        if self.buffer_errors:
+            self.buffer_errors -= 1
+            raise BufferError("Local: Queue full")
+        self.produced.append((topic, key, value, headers))
+
+    def poll(self, timeout):
+        self.polls.append(timeout)
+        return 0
+
+    def flush(self, timeout):
+        return 0
+
+
+@pytest.fixture
+def make_producer(monkeypatch):
+    """Build KafkaProducer instances backed by FakeProducer"""
+    monkeypatch.setattr(producer_module, "Producer", FakeProducer)
+
+    def make(**kwargs):
+        return KafkaProducer("localhost:9092", "user", "secret", "test-topic", **kwargs)
+
+    return make
+
+
+def test_build_records_headers_and_id_fallback():
+    """Test the record keys, values and headers built for each message"""
+    templates = [{"id": 42, "status": "error"}, {"priority": "high"}]
+    static_headers = [("source", b"test-producer")]
+    records = list(build_records(templates, 4, static_headers, orjson.dumps))
+
+    assert [key for key, _, _ in records] == [b"42", b"2", b"42", b"4"]
+    messages = [orjson.loads(value) for _, value, _ in records]
+    assert messages[1]["id"] == 2
+    assert messages[1]["priority"] == "high"
+    assert "id" not in templates[1]
+
+    headers = records[2][2]
+    assert headers[0] == ("source", b"test-producer")
+    assert dict(headers)["batch"] == b"2"
+    assert dict(headers)["timestamp"] == str(messages[2]["timestamp"]).encode()
+
+
+def test_build_records_samples_timestamp_once_per_pass(monkeypatch):
+    """Test that the timestamp is sampled once per pass over the templates"""
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(produce_test_messages.time, "time", lambda: next(clock))
+    templates = [{"id": 1}, {"id": 2}, {"id": 3}]
+    records = list(build_records(templates, 7, [], orjson.dumps))
+
+    timestamps = [orjson.loads(value)["timestamp"] for _, value, _ in records]
+    assert timestamps == [1000, 1000, 1000, 1001, 1001, 1001, 1002]
+    # Records of one pass share the same headers
+    assert records[0][2] is records[2][2]
+    assert dict(records[3][2])["timestamp"] == b"1001"
+
+
+def test_produce_many_poll_cadence(make_producer):
+    """Test that produce_many polls once every poll_every messages"""
+    producer = make_producer()
+    records = [(str(i).encode(), b"{}", []) for i in range(7)]
+
+    assert producer.produce_many(records, poll_every=3) == 7
+    assert len(producer.producer.produced) == 7
+    assert producer.producer.polls == [0, 0]
+
+
+def test_produce_many_retries_on_buffer_error(make_producer):
+    """Test that a full local queue is drained and the message retried"""
+    producer = make_producer()
+    producer.producer.buffer_errors = 2
+
+    assert producer.produce_many([(b"1", b"{}", [])]) == 1
+    assert producer.producer.produced == [("test-topic", b"1", b"{}", [])]
+    assert producer.producer.polls == [0.1, 0.1]
+
+
+def test_produce_many_rejects_invalid_poll_every(make_producer):
+    """Test that poll_every must be positive"""
+    producer = make_producer()
+    with pytest.raises(ValueError):
+        producer.produce_many([(b"1", b"{}", [])], poll_every=0)
+
+
+def test_produce_many_stops_on_stop_event(make_producer):
+    """Test that a set stop event ends produce_many early"""
+    producer = make_producer()
+    stop_event = threading.Event()
+
+    def records():
+        for i in range(10):
+            if i == 3:
+                stop_event.set()
+            yield str(i).encode(), b"{}", []
+
+    assert producer.produce_many(records(), stop_event=stop_event) == 3
+
+
+def test_flush_resets_delivery_counters(make_producer, caplog):
+    """Test that flush logs the delivery summary and resets the counters"""
+    producer = make_producer()
+    producer.delivery_callback(None, None)
+    producer.delivery_callback(None, None)
+    producer.delivery_callback("Broker: Request timed out", None)
+
+    with caplog.at_level(logging.INFO, logger="app.producer"):
+        producer.flush()
+
+    assert "Delivered 2 messages, 1 failed" in caplog.text
+    assert "Broker: Request timed out" in caplog.text
+    assert (producer._ok, producer._err, producer._err_sample) == (0, 0, None)
+
+
+def test_msgpack_format_header(make_producer):
+    """Test that msgpack messages are encoded and carry a content-type header"""
+    producer = make_producer(format="msgpack")
+    producer.produce({"id": 1}, key="1", headers={"source": "test"})
+
+    _, key, value, headers = producer.producer.produced[0]
+    assert key == b"1"
+    assert msgspec.msgpack.decode(value) == {"id": 1}
+    assert headers == [
+        ("content-type", b"application/msgpack"),
+        ("source", b"test"),
+    ]
+
+
+def test_json_format_has_no_content_type_header(make_producer):
+    """Test that JSON messages are sent without a content-type header"""
+    producer = make_producer()
+    producer.produce({"id": 1})
+
+    _, _, value, headers = producer.producer.produced[0]
+    assert orjson.loads(value) == {"id": 1}
+    assert headers == []
+
+
+
+def test_batching_config_from_env(make_producer, monkeypatch):
+    """Test that the batching and compression settings follow the environment"""
+    monkeypatch.setenv("KAFKA_LINGER_MS", "100")
+    monkeypatch.setenv("KAFKA_BATCH_SIZE", "500000")
+    monkeypatch.setenv("KAFKA_COMPRESSION", "zstd")
+    config = make_producer().producer.config
+
+    assert config["linger.ms"] == 100
+    assert config["batch.size"] == 500000
+    assert config["compression.type"] == "zstd"
+
+
+def test_delivery_config_from_env(make_producer, monkeypatch):
+    """Test that acks and retries are read from the environment"""
+    monkeypatch.setenv("KAFKA_ACKS", "1")
+    monkeypatch.setenv("KAFKA_RETRIES", "2")
+    config = make_producer().producer.config
+
+    assert config["acks"] == "1"
+    assert config["retries"] == 2
+
+
+def test_delivery_config_defaults(make_producer, monkeypatch):
+    """Test the reliable delivery defaults when no environment is set"""
+    monkeypatch.delenv("KAFKA_ACKS", raising=False)
+    monkeypatch.delenv("KAFKA_RETRIES", raising=False)
+    config = make_producer().producer.config
+
+    assert config["acks"] == "all"
+    assert config["retries"] == 5
+
+
+def test_config_overrides_take_precedence(make_producer, monkeypatch):
+    """Test that config_overrides win over environment settings"""
+    monkeypatch.setenv("KAFKA_ACKS", "all")
+    monkeypatch.setenv("KAFKA_LINGER_MS", "5")
+    config = make_producer(
+        config_overrides=producer_module.PERF_PRODUCER_CONFIG
+    ).producer.config
+
+    for name, value in producer_module.PERF_PRODUCER_CONFIG.items():
+        assert config[name] == value
+    assert config["sasl.username"] == "user"
+
+
+def test_produce_raw_polls_every_poll_interval(make_producer):
+    """Test that produce_raw serves delivery callbacks every poll_interval messages"""
+    producer = make_producer(poll_interval=3)
+    for i in range(7):
+        producer.produce_raw(b"{}", key=str(i).encode())
+
+    assert len(producer.producer.produced) == 7
+    assert producer.producer.polls == [0, 0]
+    assert producer._produced_since_poll == 1
+
+
+def test_produce_raw_retries_on_buffer_error(make_producer):
+    """Test that produce_raw drains a full local queue and retries the message"""
+    producer = make_producer()
+    producer.producer.buffer_errors = 1
+    producer.produce_raw(b"{}", key=b"1", headers=[("source", b"test")])
+
+    assert producer.producer.produced == [
+        ("test-topic", b"1", b"{}", [("source", b"test")])
+    ]
+    assert producer.producer.polls == [0.1]
+
+
+def test_flush_resets_poll_counter(make_producer):
+    """Test that flush restarts the poll_interval count"""
+    producer = make_producer(poll_interval=3)
+    producer.produce_raw(b"{}")
+    producer.produce_raw(b"{}")
+    producer.flush()
+    producer.produce_raw(b"{}")
+    producer.produce_raw(b"{}")
+
+    assert producer._produced_since_poll == 2
+    assert producer.producer.polls == []
+
+
+def test_load_messages_from_file(tmp_path):
+    """Test loading message templates from a JSON file"""
+    path = tmp_path / "messages.json"
+    path.write_bytes('[{"id": 1, "message": "h\u00e9llo"}]'.encode("utf-8"))
+
+    assert load_messages_from_file(str(path)) == [{"id": 1, "message": "h\u00e9llo"}]
+
+
+def test_load_messages_from_file_falls_back_to_defaults(tmp_path):
+    """Test that a non-list or missing file yields the default messages"""
+    path = tmp_path / "messages.json"
+    path.write_bytes(b'{"id": 1}')
+
+    assert load_messages_from_file(str(path)) == get_default_messages()
+    missing = tmp_path / "missing.json"
+    assert load_messages_from_file(str(missing)) == get_default_messages()
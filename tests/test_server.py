@@ -2,25 +2,44 @@
 Tests for the HTTP Mock server.
 """
 
-import json
-from fastapi.testclient import TestClient
+import asyncio
 
-from app.server import app
+import httpx
+import pytest
+import pytest_asyncio
 
+from app import server
+from app.server import (
+    MAX_BODY,
+    RESPONSE_CONFIGS,
+    MockServerConfig,
+    app,
+    apply_configuration,
+)
 
-client = TestClient(app)
+pytestmark = pytest.mark.asyncio
 
 
-def test_root_endpoint():
+@pytest_asyncio.fixture
+async def client():
+    """In-process async client driving the ASGI app directly"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+    # Restore the built-in configuration for the next test
+    apply_configuration(MockServerConfig.model_validate(RESPONSE_CONFIGS))
+
+
+async def test_root_endpoint(client):
     """Test the root endpoint"""
-    response = client.get("/")
+    response = await client.get("/")
     assert response.status_code == 200
     assert response.json() == {"status": "ok", "message": "HTTP Mock Server is running"}
 
 
-def test_default_response():
+async def test_default_response(client):
     """Test the default response for a message"""
-    response = client.post(
+    response = await client.post(
         "/api/messages",
         json={"id": 1, "message": "Test message"}
     )
@@ -28,9 +47,9 @@ def test_default_response():
     assert response.json() == {"message": "Message received successfully"}
 
 
-def test_error_status_response():
+async def test_error_status_response(client):
     """Test response for a message with error status"""
-    response = client.post(
+    response = await client.post(
         "/api/messages",
         json={"id": 2, "status": "error", "message": "Error message"}
     )
@@ -38,9 +57,9 @@ def test_error_status_response():
     assert response.json() == {"error": "Bad request due to status=error"}
 
 
-def test_high_priority_response():
+async def test_high_priority_response(client):
     """Test response for a high priority message"""
-    response = client.post(
+    response = await client.post(
         "/api/messages",
         json={"id": 3, "priority": "high", "message": "High priority message"}
     )
@@ -48,9 +67,9 @@ def test_high_priority_response():
     assert response.json() == {"message": "High priority message processed"}
 
 
-def test_reject_action_response():
+async def test_reject_action_response(client):
     """Test response for a message with reject action"""
-    response = client.post(
+    response = await client.post(
         "/api/messages",
         json={"id": 4, "action": "reject", "message": "Reject message"}
     )
@@ -58,7 +77,36 @@ def test_reject_action_response():
     assert response.json() == {"error": "Message rejected as requested"}
 
 
-def test_update_configuration():
+async def test_first_matching_rule_wins(client):
+    """Test that the earliest configured rule wins when several rules match"""
+    response = await client.post(
+        "/api/messages",
+        json={"id": 5, "priority": "high", "status": "error"}
+    )
+    assert response.status_code == 400
+    assert response.json() == {"error": "Bad request due to status=error"}
+
+
+async def test_non_object_message_gets_default_response(client):
+    """Test that JSON arrays and scalars get the default response"""
+    for payload in (["status", "error"], "error", 42, {}):
+        response = await client.post("/api/messages", json=payload)
+        assert response.status_code == 200
+        assert response.json() == {"message": "Message received successfully"}
+
+
+async def test_invalid_json_response(client):
+    """Test response for a message that is not valid JSON"""
+    response = await client.post(
+        "/api/messages",
+        content=b"not json",
+        headers={"Content-Type": "application/json"},
+    )
+    assert response.status_code == 400
+    assert response.json() == {"error": "Invalid JSON format"}
+
+
+async def test_update_configuration(client):
     """Test updating the server configuration"""
     new_config = {
         "default": {
@@ -76,16 +124,16 @@ def test_update_configuration():
     }
     
     # Update the configuration
-    response = client.post("/config", json=new_config)
+    response = await client.post("/config", json=new_config)
     assert response.status_code == 200
     
     # Verify the configuration was updated
-    response = client.get("/config")
+    response = await client.get("/config")
     assert response.status_code == 200
     assert response.json()["default"]["response_code"] == 202
     
     # Test the new configuration
-    response = client.post(
+    response = await client.post(
         "/api/messages",
         json={"id": 5, "custom": "test", "message": "Custom test"}
     )
@@ -93,9 +141,84 @@ def test_update_configuration():
     assert response.json() == {"message": "I'm a teapot"}
     
     # Test the new default response
-    response = client.post(
+    response = await client.post(
         "/api/messages",
         json={"id": 6, "message": "Regular message"}
     )
     assert response.status_code == 202
     assert response.json() == {"message": "Custom default response"}
+
+
+async def test_oversized_body_rejected(client):
+    """Test that message bodies larger than MAX_BODY are rejected"""
+    response = await client.post(
+        "/api/messages",
+        content=b"x" * (MAX_BODY + 1),
+        headers={"Content-Type": "application/json"},
+    )
+    assert response.status_code == 413
+    assert response.json() == {"error": "Request body too large"}
+
+
+async def test_concurrent_messages(client):
+    """Fire many concurrent messages through the hot path as a perf smoke test"""
+    payloads = [
+        {"id": 1, "message": "Test message"},
+        {"id": 2, "status": "error"},
+        {"id": 3, "priority": "high"},
+        {"id": 4, "action": "reject"},
+    ]
+    expected = [200, 400, 201, 422]
+    count = 10_000
+    responses = await asyncio.gather(
+        *(
+            client.post("/api/messages", json=payloads[i % len(payloads)])
+            for i in range(count)
+        )
+    )
+    assert [r.status_code for r in responses] == [
+        expected[i % len(expected)] for i in range(count)
+    ]
+
+
+async def test_unserializable_configuration_rejected(client):
+    """Test that a configuration orjson cannot encode is rejected as a whole"""
+    response = await client.get("/config")
+    old_config = response.json()
+
+    new_config = {
+        "configurations": [
+            {
+                "match_field": "id",
+                "match_value": 123456789012345678901234567890,
+                "response_code": 418,
+                "response_body": {"message": "I'm a teapot"}
+            }
+        ]
+    }
+    response = await client.post("/config", json=new_config)
+    assert response.status_code == 422
+
+    # The previous configuration is still served and applied
+    response = await client.get("/config")
+    assert response.json() == old_config
+    assert server.server_config == old_config
+    response = await client.post(
+        "/api/messages",
+        json={"id": 2, "status": "error"}
+    )
+    assert response.status_code == 400
+
+
+async def test_invalid_default_configuration_rejected(client):
+    """Test that a malformed default response is rejected before it is applied"""
+    for default in (
+        {"response_code": "abc", "response_body": {}},
+        {"response_code": 202, "response_body": ["not", "an", "object"]},
+    ):
+        response = await client.post("/config", json={"default": default})
+        assert response.status_code == 422
+
+    response = await client.post("/api/messages", json={"id": 1})
+    assert response.status_code == 200
+    assert response.json() == {"message": "Message received successfully"}